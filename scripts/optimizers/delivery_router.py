@@ -12,20 +12,28 @@
 - 최적 경로 및 배차 계획
 """
 
+import io
 import math
 import csv
 import json
+import threading
+from array import array
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, TextIO
 from pathlib import Path
 from collections import defaultdict
+from itertools import repeat, islice
 
 
 # ============================================================
 # 데이터 모델
 # ============================================================
 
+# 지구 지름 (km) - Haversine 2·R·asin(√a)의 2·R을 미리 곱해 둔 값
+EARTH_DIAMETER_KM = 2 * 6371.0
+
+
 @dataclass
 class Location:
     """위치 정보"""
@@ -33,6 +41,15 @@ class Location:
     address: str
     lat: float = 0.0
     lon: float = 0.0
+    # 거리 계산용 캐시 (라디안, cos(위도))
+    lat_rad: float = field(init=False, repr=False, compare=False)
+    lon_rad: float = field(init=False, repr=False, compare=False)
+    cos_lat: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.lat_rad = math.radians(self.lat)
+        self.lon_rad = math.radians(self.lon)
+        self.cos_lat = math.cos(self.lat_rad)
 
     def distance_to(self, other: 'Location') -> float:
         """다른 위치까지 거리 (km) - Haversine 공식"""
@@ -40,20 +57,112 @@ class Location:
             # 좌표가 없으면 임의 거리 반환 (테스트용)
             return 10.0
 
-        R = 6371  # 지구 반경 (km)
-        lat1, lon1 = math.radians(self.lat), math.radians(self.lon)
-        lat2, lon2 = math.radians(other.lat), math.radians(other.lon)
-
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
+        return haversine(
+            self.lat_rad, self.lon_rad, self.cos_lat,
+            other.lat_rad, other.lon_rad, other.cos_lat,
+        )
 
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
 
-        return R * c
+def haversine(
+    lat1: float, lon1: float, cos_lat1: float,
+    lat2: float, lon2: float, cos_lat2: float,
+) -> float:
+    """두 지점 간 거리 (km) - 라디안과 cos(위도)를 미리 계산해 둔 Haversine 공식"""
+    s_lat = math.sin((lat2 - lat1) * 0.5)
+    s_lon = math.sin((lon2 - lon1) * 0.5)
+    a = s_lat * s_lat + cos_lat1 * cos_lat2 * (s_lon * s_lon)
+
+    return EARTH_DIAMETER_KM * math.asin(math.sqrt(a))
+
+
+def haversine_row(
+    i: int,
+    lats: list[float],
+    lons: list[float],
+    cos_lats: list[float],
+) -> list[float]:
+    """지점 i에서 모든 지점까지의 거리 (km)
+
+    lats/lons는 라디안, cos_lats는 cos(위도). 위도가 0인 지점은 좌표가 없는
+    것으로 보고 Location.distance_to와 동일하게 10km로 취급한다.
+    """
+    # 셀마다 haversine()을 호출하지 않도록 수식을 인라인하고 math 함수를 지역 변수로 묶는다
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    D = EARTH_DIAMETER_KM
+
+    n = len(lats)
+    lat1, lon1, cos1 = lats[i], lons[i], cos_lats[i]
+    row = [10.0] * n
+    if lat1 != 0:
+        for j, (lat2, lon2, cos2) in enumerate(zip(lats, lons, cos_lats)):
+            if lat2 != 0:
+                s_lat = sin((lat2 - lat1) * 0.5)
+                s_lon = sin((lon2 - lon1) * 0.5)
+                row[j] = D * asin(sqrt(s_lat * s_lat + cos1 * cos2 * (s_lon * s_lon)))
+    row[i] = 0.0
+    return row
+
+
+def haversine_matrix(
+    lats: list[float],
+    lons: list[float],
+    cos_lats: list[float],
+) -> list[list[float]]:
+    """지점 간 거리 매트릭스 (km) - haversine_row 참조
+
+    거리는 대칭이다 (부호만 바뀐 차이의 sin을 제곱하므로 d[i][j]와 d[j][i]는
+    비트 단위까지 같다). 위 삼각만 계산해 아래 삼각에 복사하므로 삼각함수
+    호출이 행 단위 계산의 절반이다.
+    """
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    D = EARTH_DIAMETER_KM
+
+    n = len(lats)
+    matrix = [[10.0] * n for _ in range(n)]
+    for i in range(n):
+        row = matrix[i]
+        row[i] = 0.0
+        lat1, lon1, cos1 = lats[i], lons[i], cos_lats[i]
+        if lat1 == 0:
+            continue
+        for j in range(i + 1, n):
+            lat2 = lats[j]
+            if lat2 != 0:
+                s_lat = sin((lat2 - lat1) * 0.5)
+                s_lon = sin((lons[j] - lon1) * 0.5)
+                row[j] = matrix[j][i] = D * asin(sqrt(s_lat * s_lat + cos1 * cos_lats[j] * (s_lon * s_lon)))
+    return matrix
+
+
+class LazyDistanceMatrix:
+    """요청된 행만 계산하는 거리 매트릭스
+
+    최근접 이웃은 방문한 노드의 행만 읽으므로, 출하가 많을 때 (N+1)² 전체를
+    만들지 않고 방문 노드 수 × N만 계산/보관한다. dist[i][j]로 접근한다.
+
+    보관하는 행은 float64 연속 배열(array('d'))로, 원소당 8바이트만 쓴다
+    (list는 float 객체 + 포인터로 원소당 약 32바이트).
+    """
+
+    def __init__(self, lats: list[float], lons: list[float], cos_lats: list[float]):
+        self._lats = lats
+        self._lons = lons
+        self._cos_lats = cos_lats
+        self._rows: dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return len(self._lats)
+
+    def __getitem__(self, i: int) -> array:
+        row = self._rows.get(i)
+        if row is None:
+            row = self._rows[i] = array(
+                'd', haversine_row(i, self._lats, self._lons, self._cos_lats)
+            )
+        return row
 
 
-@dataclass
+@dataclass(slots=True)
 class Shipment:
     """출하 정보"""
     shipment_id: str
@@ -64,10 +173,15 @@ class Shipment:
     time_window: str = "ANY"  # AM, PM, ANY
     lat: float = 0.0
     lon: float = 0.0
+    # 거리 계산용 캐시 (라디안, cos(위도))
+    lat_rad: float = field(init=False, repr=False, compare=False)
+    lon_rad: float = field(init=False, repr=False, compare=False)
+    cos_lat: float = field(init=False, repr=False, compare=False)
 
-    @property
-    def location(self) -> Location:
-        return Location(self.customer, self.address, self.lat, self.lon)
+    def __post_init__(self):
+        self.lat_rad = math.radians(self.lat)
+        self.lon_rad = math.radians(self.lon)
+        self.cos_lat = math.cos(self.lat_rad)
 
 
 @dataclass
@@ -83,7 +197,7 @@ class Vehicle:
     available: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class Route:
     """경로 정보"""
     vehicle_id: str
@@ -92,19 +206,23 @@ class Route:
     total_weight_kg: float = 0.0
     total_pallets: int = 0
     estimated_time_hours: float = 0.0
+    vehicle: Optional[Vehicle] = None  # 없으면 VEHICLES에서 vehicle_id로 조회
+
+    def __post_init__(self):
+        if self.vehicle is None:
+            self.vehicle = VEHICLES.get(self.vehicle_id)
 
     @property
     def cost(self) -> float:
         """총 비용 계산"""
-        vehicle = VEHICLES.get(self.vehicle_id)
-        if not vehicle:
+        vehicle = self.vehicle
+        if not vehicle or not self.stops:
             return 0.0
 
         fuel_cost = self.total_distance_km * vehicle.cost_per_km
         labor_cost = self.estimated_time_hours * vehicle.hourly_rate
-        fixed_cost = vehicle.fixed_cost if self.stops else 0
 
-        return fuel_cost + labor_cost + fixed_cost
+        return fuel_cost + labor_cost + vehicle.fixed_cost
 
 
 @dataclass
@@ -153,11 +271,90 @@ AVERAGE_SPEED = 40
 # 배송당 평균 하차 시간 (분)
 UNLOAD_TIME_MIN = 15
 
+# 시간 제약 처리 순서 (그 외 = ANY)
+TIME_WINDOW_RANK = {"AM": 0, "PM": 1}
+TIME_WINDOW_RANK_ANY = 2
+
+# 이 출하 수를 넘으면 거리 매트릭스를 전부 만들지 않고 행 단위로 계산
+DENSE_MATRIX_MAX_SHIPMENTS = 200
+
+# 좌표가 같은 출하 목록의 거리 테이블을 라우터 인스턴스 간에 재사용할 때 보관하는
+# 총 셀 수 (노드 수² 합, 셀당 약 20바이트 → 프로세스당 최대 약 5MB)
+# (재계획/재시도/데모 반복 실행 시 O(N²) 재계산 방지)
+DIST_CACHE_MAX_CELLS = 250_000
+
+# CSV 로드 시 한 번에 읽어 파싱하는 행 수 (파일 전체 행을 메모리에 들고 있지 않음)
+CSV_CHUNK_ROWS = 10_000
+
+
+# ============================================================
+# 경로 탐색 커널
+# ============================================================
+
+def _nn_route(
+    dist: list[list[float]],
+    weights: list[float],
+    pallets: list[int],
+    cap_w: float,
+    cap_p: int,
+    order: list[int],
+    available: list[bool],
+) -> list[int]:
+    """최근접 이웃 방문 순서 계산
+
+    dist/weights/pallets/available은 노드 번호(0 = 공장)로 인덱싱한다.
+    order는 우선순위 순 후보 노드이며, 거리가 같으면 앞선 후보를 택한다.
+    방문한 노드는 available에서 제자리로 False 처리된다.
+
+    적재량은 늘기만 하므로 한 번 적재 불가로 판정된 후보는 이 경로에서 다시
+    가능해지지 않는다. 후보 목록을 스캔하면서 제자리 압축해 이후 스캔에서 뺀다.
+    """
+    visits = []
+    w = 0.0
+    p = 0
+    current = 0
+    candidates = [
+        j for j in order
+        if available[j] and weights[j] <= cap_w and pallets[j] <= cap_p
+    ]
+
+    while candidates:
+        row = dist[current]
+        best = -1
+        best_dist = math.inf
+        keep = 0
+        for j in candidates:
+            if available[j] and w + weights[j] <= cap_w and p + pallets[j] <= cap_p:
+                candidates[keep] = j
+                keep += 1
+                if row[j] < best_dist:
+                    best = j
+                    best_dist = row[j]
+        del candidates[keep:]
+
+        if best < 0:
+            break
+
+        available[best] = False
+        visits.append(best)
+        w += weights[best]
+        p += pallets[best]
+        current = best
+
+    return visits
+
 
 # ============================================================
 # 라우터
 # ============================================================
 
+# 노드 좌표 (위도, 경도 라디안 튜플) → 거리 테이블. 오래된 것부터 제거 (FIFO)
+# 여러 스레드(to_thread/executor)에서 채우므로 변경은 잠금 안에서만 한다
+_dist_cache: dict = {}
+_dist_cache_cells = 0  # 캐시에 든 테이블의 셀 수 합 (노드 수²)
+_dist_cache_lock = threading.Lock()
+
+
 class DeliveryRouter:
     """배송 경로 최적화"""
 
@@ -165,56 +362,130 @@ class DeliveryRouter:
         self.depot = depot or DEPOT
         self.vehicles = vehicles or VEHICLES
         self.shipments: list[Shipment] = []
+        self._materialize()
 
     def add_shipments(self, shipments: list[Shipment]):
         """출하 추가"""
         self.shipments.extend(shipments)
+        self._materialize()
+
+    def reset(self):
+        """출하 초기화 (공장/차량 설정은 유지, 이전 결과가 참조하는 리스트는 건드리지 않음)
+
+        한 스레드가 전용으로 쓰는 인스턴스(서브에이전트의 워커별 라우터)를 재사용할
+        때만 쓴다. 실행 중인 다른 작업과 공유하는 인스턴스에서 호출하면 안 된다.
+        """
+        self.shipments = []
+        self._materialize()
 
-    def calculate_distance_matrix(self) -> dict:
-        """거리 매트릭스 계산"""
-        locations = [self.depot] + [s.location for s in self.shipments]
-        matrix = {}
-
-        for i, loc1 in enumerate(locations):
-            for j, loc2 in enumerate(locations):
-                key = (i, j)
-                if i == j:
-                    matrix[key] = 0
-                else:
-                    matrix[key] = loc1.distance_to(loc2)
-
-        return matrix
-
-    def nearest_neighbor(self, shipments: list[Shipment], vehicle: Vehicle) -> Route:
-        """최근접 이웃 알고리즘으로 경로 생성"""
-        route = Route(vehicle_id=vehicle.vehicle_id)
-        remaining = shipments.copy()
-        current_location = self.depot
-
-        while remaining:
-            # 적재 가능한 shipment 필터
-            feasible = [
-                s for s in remaining
-                if (route.total_weight_kg + s.weight_kg <= vehicle.capacity_kg and
-                    route.total_pallets + s.pallets <= vehicle.capacity_pallets)
-            ]
-
-            if not feasible:
-                break
-
-            # 가장 가까운 shipment 선택
-            nearest = min(feasible, key=lambda s: current_location.distance_to(s.location))
-            route.stops.append(nearest)
-            route.total_weight_kg += nearest.weight_kg
-            route.total_pallets += nearest.pallets
-            route.total_distance_km += current_location.distance_to(nearest.location)
-
-            current_location = nearest.location
-            remaining.remove(nearest)
+    def _materialize(self):
+        """출하 목록을 노드 번호(0 = 공장) 기준 병렬 리스트(SoA)로 변환
+
+        경로 계산은 이 리스트만 읽고, Shipment 객체는 결과 구성에만 사용한다.
+        """
+        depot = self.depot
+        self._nodes: list = [None] + self.shipments
+        self._node_of = {id(s): i for i, s in enumerate(self.shipments, 1)}
+        self._weights = [0.0] + [s.weight_kg for s in self.shipments]
+        self._pallets = [0] + [s.pallets for s in self.shipments]
+        self._tw_ranks = [TIME_WINDOW_RANK_ANY] + [
+            TIME_WINDOW_RANK.get(s.time_window, TIME_WINDOW_RANK_ANY) for s in self.shipments
+        ]
+        self._lats = [depot.lat_rad] + [s.lat_rad for s in self.shipments]
+        self._lons = [depot.lon_rad] + [s.lon_rad for s in self.shipments]
+        self._cos_lats = [depot.cos_lat] + [s.cos_lat for s in self.shipments]
+        self._dist = None  # 거리 테이블 캐시 (출하가 바뀌면 무효화)
+
+    def calculate_distance_matrix(self) -> list[list[float]]:
+        """거리 매트릭스 계산
+
+        행/열 0은 공장, i(>=1)는 self.shipments[i-1]에 대응한다.
+        호출마다 새 리스트를 돌려준다 (수정해도 다른 라우터가 공유하는 캐시에 영향 없음).
+        """
+        if isinstance(self._dist, list):
+            return [row[:] for row in self._dist]
+        return haversine_matrix(self._lats, self._lons, self._cos_lats)
+
+    def _distance_table(self):
+        """create_plan용 거리 테이블 (캐시, 출하가 많으면 LazyDistanceMatrix)
+
+        같은 좌표 순서의 출하 목록이면 다른 라우터가 만든 2차원 테이블을 공유한다
+        (공유 테이블은 읽기 전용, 밖으로는 calculate_distance_matrix()의 사본만 내보낸다).
+        LazyDistanceMatrix는 커질 수 있어 공유 캐시에 넣지 않는다 (이 라우터에서만 재사용).
+        """
+        global _dist_cache_cells
+
+        if self._dist is None:
+            if len(self.shipments) > DENSE_MATRIX_MAX_SHIPMENTS:
+                self._dist = LazyDistanceMatrix(self._lats, self._lons, self._cos_lats)
+                return self._dist
+
+            key = (tuple(self._lats), tuple(self._lons))
+            dist = _dist_cache.get(key)
+            if dist is None:
+                dist = haversine_matrix(self._lats, self._lons, self._cos_lats)
+                cells = len(dist) ** 2
+                # 한도보다 큰 테이블은 넣자마자 밀려나므로 캐시하지 않는다
+                if cells <= DIST_CACHE_MAX_CELLS:
+                    with _dist_cache_lock:
+                        if key not in _dist_cache:
+                            _dist_cache[key] = dist
+                            _dist_cache_cells += cells
+                        # 총 셀 수가 한도 이하가 될 때까지 오래된 것부터 제거
+                        while _dist_cache_cells > DIST_CACHE_MAX_CELLS:
+                            old_key = next(iter(_dist_cache))
+                            _dist_cache_cells -= len(_dist_cache.pop(old_key)) ** 2
+            self._dist = dist
+        return self._dist
+
+    def nearest_neighbor(
+        self,
+        shipments: list[Shipment],
+        vehicle: Vehicle,
+        dist=None,
+    ) -> Route:
+        """최근접 이웃 알고리즘으로 경로 생성
+
+        dist: calculate_distance_matrix() 결과 또는 LazyDistanceMatrix
+              (없으면 shipments 기준으로 계산)
+        """
+        if dist is None:
+            sub = DeliveryRouter(self.depot, self.vehicles)
+            sub.add_shipments(shipments)
+            return sub.nearest_neighbor(shipments, vehicle, sub.calculate_distance_matrix())
+
+        nodes = [self._node_of[id(s)] for s in shipments]
+        available = [False] * len(self._nodes)
+        for node in nodes:
+            available[node] = True
+
+        visits = _nn_route(
+            dist, self._weights, self._pallets,
+            vehicle.capacity_kg, vehicle.capacity_pallets, nodes, available,
+        )
+        return self._build_route(vehicle, visits, dist)
+
+    def _build_route(
+        self,
+        vehicle: Vehicle,
+        visits: list[int],
+        dist: list[list[float]],
+    ) -> Route:
+        """방문 순서(노드 번호)로부터 Route 구성"""
+        route = Route(vehicle_id=vehicle.vehicle_id, vehicle=vehicle)
+        current = 0  # 공장
+
+        for node in visits:
+            stop = self._nodes[node]
+            route.stops.append(stop)
+            route.total_weight_kg += stop.weight_kg
+            route.total_pallets += stop.pallets
+            route.total_distance_km += dist[current][node]
+            current = node
 
         # 공장으로 복귀 거리 추가
         if route.stops:
-            route.total_distance_km += current_location.distance_to(self.depot)
+            route.total_distance_km += dist[current][0]
             route.estimated_time_hours = (
                 route.total_distance_km / AVERAGE_SPEED +
                 len(route.stops) * UNLOAD_TIME_MIN / 60
@@ -231,17 +502,16 @@ class DeliveryRouter:
         3. 최근접 이웃 알고리즘으로 경로 생성
         """
         plan = RoutePlan(date=target_date)
+        nodes = self._nodes
 
-        # 시간 제약으로 정렬 (AM 먼저)
-        sorted_shipments = sorted(
-            self.shipments,
-            key=lambda s: (
-                0 if s.time_window == "AM" else (1 if s.time_window == "PM" else 2),
-                -s.weight_kg  # 무거운 것 먼저
-            )
-        )
+        # 시간 제약으로 정렬 (AM 먼저, 같으면 무거운 것 먼저), 노드 번호로 관리
+        # 안정 정렬 두 번 (보조 키 → 주 키)으로 튜플 키 없이 같은 순서를 만든다
+        order = sorted(range(1, len(nodes)), key=self._weights.__getitem__, reverse=True)
+        order.sort(key=self._tw_ranks.__getitem__)
 
-        remaining = sorted_shipments.copy()
+        dist = self._distance_table()
+        available = [False] + [True] * len(self.shipments)  # 미할당 여부
+        remaining = len(self.shipments)
 
         # 차량별 경로 생성
         for vehicle_id, vehicle in sorted(
@@ -251,17 +521,18 @@ class DeliveryRouter:
             if not vehicle.available or not remaining:
                 continue
 
-            route = self.nearest_neighbor(remaining, vehicle)
+            # 할당된 shipment는 available에서 제외됨
+            visits = _nn_route(
+                dist, self._weights, self._pallets,
+                vehicle.capacity_kg, vehicle.capacity_pallets, order, available,
+            )
 
-            if route.stops:
-                plan.routes.append(route)
-                # 할당된 shipment 제거
-                for stop in route.stops:
-                    if stop in remaining:
-                        remaining.remove(stop)
+            if visits:
+                plan.routes.append(self._build_route(vehicle, visits, dist))
+                remaining -= len(visits)
 
         # 미할당 shipment
-        plan.unassigned = remaining
+        plan.unassigned = [nodes[i] for i in order if available[i]]
 
         return plan
 
@@ -272,6 +543,10 @@ class DeliveryRouter:
         - 2-opt: 경로 내 교차 제거
         - Or-opt: 연속 노드 이동
         - 차량 간 shipment 교환
+
+        구현 시 Shipment 객체 대신 노드 번호 기준 테이블(self._weights,
+        self._pallets, calculate_distance_matrix())을 입력으로 받는 모듈 수준
+        숫자 커널로 작성한다 (_nn_route 참고, JIT 적용이 가능한 형태).
         """
         return plan
 
@@ -280,54 +555,77 @@ class DeliveryRouter:
 # 출력 포맷터
 # ============================================================
 
-def format_plan_markdown(plan: RoutePlan) -> str:
-    """계획을 마크다운으로 포맷"""
-    lines = [
-        f"# 배송 계획 - {plan.date.strftime('%Y-%m-%d')}",
-        "",
-        "## 요약",
-        "",
-        "| 항목 | 값 |",
-        "|------|-----|",
-    ]
+PLAN_MD_HEADER_FMT = """\
+# 배송 계획 - {date}
 
-    summary = plan.summary()
-    lines.append(f"| 총 배송 | {summary['total_shipments']}건 |")
-    lines.append(f"| 미배정 | {summary['unassigned_shipments']}건 |")
-    lines.append(f"| 사용 차량 | {summary['vehicles_used']}대 |")
-    lines.append(f"| 총 거리 | {summary['total_distance_km']}km |")
-    lines.append(f"| 총 비용 | {summary['total_cost']:,}원 |")
+## 요약
 
-    lines.extend(["", "## 차량별 경로", ""])
+| 항목 | 값 |
+|------|-----|
+| 총 배송 | {total_shipments}건 |
+| 미배정 | {unassigned_shipments}건 |
+| 사용 차량 | {vehicles_used}대 |
+| 총 거리 | {total_distance_km}km |
+| 총 비용 | {total_cost:,}원 |
 
-    for route in plan.routes:
-        if not route.stops:
-            continue
+## 차량별 경로
+"""
+
+ROUTE_MD_FMT = """
+### {name}
+
+- **총 거리**: {distance:.1f}km
+- **적재량**: {weight:.0f}kg / {pallets}파렛트
+- **예상 시간**: {hours:.1f}시간
+- **비용**: {cost:,.0f}원
 
-        vehicle = VEHICLES.get(route.vehicle_id)
-        vehicle_name = vehicle.name if vehicle else route.vehicle_id
+| 순서 | 고객 | 주소 | 중량 |
+|:----:|------|------|-----:|"""
 
-        lines.append(f"### {vehicle_name}")
-        lines.append("")
-        lines.append(f"- **총 거리**: {route.total_distance_km:.1f}km")
-        lines.append(f"- **적재량**: {route.total_weight_kg:.0f}kg / {route.total_pallets}파렛트")
-        lines.append(f"- **예상 시간**: {route.estimated_time_hours:.1f}시간")
-        lines.append(f"- **비용**: {route.cost:,.0f}원")
-        lines.append("")
-        lines.append("| 순서 | 고객 | 주소 | 중량 |")
-        lines.append("|:----:|------|------|-----:|")
+# 행마다 앞에 줄바꿈을 붙여 블록 단위로 이어 쓴다
+STOP_ROW_FMT = "\n| {} | {} | {} | {:.0f}kg |"
+UNASSIGNED_ROW_FMT = "\n- {}: {} ({}kg)"
 
-        for i, stop in enumerate(route.stops, 1):
-            lines.append(f"| {i} | {stop.customer} | {stop.address} | {stop.weight_kg:.0f}kg |")
 
-        lines.append("")
+def write_plan_markdown(plan: RoutePlan, out: TextIO):
+    """계획을 마크다운으로 스트림에 기록
+
+    경로마다 미리 정의한 템플릿으로 블록 문자열 하나를 만들어 한 번에 쓴다.
+    """
+    summary = plan.summary()
+    out.write(PLAN_MD_HEADER_FMT.format(**summary))
+
+    for route in plan.routes:
+        if not route.stops:
+            continue
+
+        out.write(ROUTE_MD_FMT.format(
+            name=route.vehicle.name if route.vehicle else route.vehicle_id,
+            distance=route.total_distance_km,
+            weight=route.total_weight_kg,
+            pallets=route.total_pallets,
+            hours=route.estimated_time_hours,
+            cost=route.cost,
+        ))
+        out.write("".join(
+            STOP_ROW_FMT.format(i, stop.customer, stop.address, stop.weight_kg)
+            for i, stop in enumerate(route.stops, 1)
+        ))
+        out.write("\n")
 
     if plan.unassigned:
-        lines.extend(["## ⚠️ 미배정 배송", ""])
-        for shipment in plan.unassigned:
-            lines.append(f"- {shipment.shipment_id}: {shipment.customer} ({shipment.weight_kg}kg)")
+        out.write("\n## ⚠️ 미배정 배송\n")
+        out.write("".join(
+            UNASSIGNED_ROW_FMT.format(s.shipment_id, s.customer, s.weight_kg)
+            for s in plan.unassigned
+        ))
 
-    return "\n".join(lines)
+
+def format_plan_markdown(plan: RoutePlan) -> str:
+    """계획을 마크다운으로 포맷"""
+    buf = io.StringIO()
+    write_plan_markdown(plan, buf)
+    return buf.getvalue()
 
 
 def format_plan_json(plan: RoutePlan) -> dict:
@@ -338,7 +636,7 @@ def format_plan_json(plan: RoutePlan) -> dict:
         "routes": [
             {
                 "vehicle_id": r.vehicle_id,
-                "vehicle_name": VEHICLES.get(r.vehicle_id, Vehicle(r.vehicle_id, r.vehicle_id, 0, 0)).name,
+                "vehicle_name": r.vehicle.name if r.vehicle else r.vehicle_id,
                 "total_distance_km": round(r.total_distance_km, 1),
                 "total_weight_kg": r.total_weight_kg,
                 "total_pallets": r.total_pallets,
@@ -391,37 +689,82 @@ def create_sample_shipments() -> list[Shipment]:
 
 def load_shipments_from_csv(filepath: str) -> list[Shipment]:
     """CSV에서 출하 로드"""
-    shipments = []
     path = Path(filepath)
 
     if not path.exists():
         raise FileNotFoundError(f"출하 파일을 찾을 수 없습니다: {filepath}")
 
-    with open(path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-
-        for row in reader:
-            shipment = Shipment(
-                shipment_id=row['shipment_id'],
-                customer=row['customer'],
-                address=row['address'],
-                weight_kg=float(row['weight_kg']),
-                pallets=int(row.get('pallets', 1)),
-                time_window=row.get('time_window', 'ANY'),
-                lat=float(row.get('lat', 0)),
-                lon=float(row.get('lon', 0)),
-            )
-            shipments.append(shipment)
+    def column(name: str, convert=None, default=None):
+        """현재 청크에서 열 하나를 추출해 일괄 변환 (default가 있으면 선택 열)"""
+        i = col[name] if default is None else col.get(name)
+        if i is None:
+            return repeat(default)
+        values = [row[i] for row in rows]
+        return list(map(convert, values)) if convert else values
+
+    shipments: list[Shipment] = []
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        col = {name: i for i, name in enumerate(next(reader, []))}
+
+        # CSV_CHUNK_ROWS행씩 열 단위로 파싱한 뒤 (SoA) Shipment로 조립 (AoS)
+        while chunk := list(islice(reader, CSV_CHUNK_ROWS)):
+            rows = [row for row in chunk if row]
+            shipments.extend(map(
+                Shipment,
+                column('shipment_id'),
+                column('customer'),
+                column('address'),
+                column('weight_kg', float),
+                column('pallets', int, 1),
+                column('time_window', default='ANY'),
+                column('lat', float, 0.0),
+                column('lon', float, 0.0),
+            ))
 
     return shipments
 
 
+def shipments_from_records(records: list[dict]) -> list[Shipment]:
+    """dict 목록(에이전트 직접 입력)에서 출하 생성
+
+    load_shipments_from_csv와 같이 열 단위로 일괄 변환한 뒤 한 번에 조립한다.
+    필수 키: shipment_id, customer, address, weight_kg
+    """
+    def column(key: str, convert=None, default=None):
+        """키 하나를 추출해 일괄 변환 (default가 있으면 선택 키)
+
+        선택 키도 보통 모든 레코드에 있으므로 먼저 직접 인덱싱하고,
+        빠진 레코드가 있을 때만 .get으로 다시 추출한다 (입력 dict는 수정하지 않음).
+        """
+        try:
+            values = [r[key] for r in records]
+        except KeyError:
+            if default is None:
+                raise
+            values = [r.get(key, default) for r in records]
+        return list(map(convert, values)) if convert else values
+
+    return list(map(
+        Shipment,
+        column('shipment_id'),
+        column('customer'),
+        column('address'),
+        column('weight_kg', float),
+        column('pallets', int, 1),
+        column('time_window', default='ANY'),
+        column('lat', float, 0),
+        column('lon', float, 0),
+    ))
+
+
 # ============================================================
 # 메인
 # ============================================================
 
-def main():
-    """메인 함수"""
+def _build_parser():
+    """CLI 인자 파서 구성"""
     import argparse
 
     parser = argparse.ArgumentParser(description="세영화학 배송 경로 최적화")
@@ -430,8 +773,20 @@ def main():
     parser.add_argument("--output", type=str, default="outputs/routes", help="출력 디렉토리")
     parser.add_argument("--format", choices=["md", "json", "both"], default="both")
     parser.add_argument("--demo", action="store_true", help="데모 모드")
+    return parser
+
+
+# 파서는 처음 main()에서 한 번 만들어 재사용한다 (라이브러리로 import할 때는 만들지 않음)
+_PARSER = None
+
+
+def main():
+    """메인 함수"""
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = _build_parser()
 
-    args = parser.parse_args()
+    args = _PARSER.parse_args()
 
     # 날짜 설정
     if args.date:
@@ -472,11 +827,12 @@ def main():
     os.makedirs(args.output, exist_ok=True)
 
     date_str = target_date.strftime("%Y%m%d")
+    md = format_plan_markdown(plan)  # 파일 저장과 콘솔 출력에 같이 사용
 
     if args.format in ["md", "both"]:
         md_path = os.path.join(args.output, f"route-{date_str}.md")
         with open(md_path, "w", encoding="utf-8") as f:
-            f.write(format_plan_markdown(plan))
+            f.write(md)
         print(f"\n📄 마크다운 저장: {md_path}")
 
     if args.format in ["json", "both"]:
@@ -487,7 +843,7 @@ def main():
 
     # 콘솔 출력
     print("\n" + "="*60)
-    print(format_plan_markdown(plan))
+    print(md)
 
 
 if __name__ == "__main__":
@@ -17,6 +17,7 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import Optional
 from collections import defaultdict
+from itertools import repeat, islice
 import json
 import csv
 from pathlib import Path
@@ -26,7 +27,7 @@ from pathlib import Path
 # 데이터 모델
 # ============================================================
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     """주문 정보"""
     order_id: str
@@ -36,10 +37,12 @@ class Order:
     due_date: datetime
     color: str = "CLEAR"  # CLEAR, COLOR
     priority: int = 1  # 1: 일반, 2: 급함, 3: 매우급함
+    color_id: int = field(init=False, repr=False, compare=False)  # SETUP_TIME_TABLE 인덱스
 
     def __post_init__(self):
         if isinstance(self.due_date, str):
             self.due_date = datetime.fromisoformat(self.due_date)
+        self.color_id = COLOR_IDS.get(self.color, COLOR_ID_OTHER)
 
 
 @dataclass
@@ -55,7 +58,7 @@ class Machine:
     current_setup: Optional[str] = None  # 현재 셋업된 제품 코드
 
 
-@dataclass
+@dataclass(slots=True)
 class ScheduleSlot:
     """스케줄 슬롯"""
     machine_id: str
@@ -105,19 +108,60 @@ MACHINES = [
     Machine("M3", "3호기", width_min=700, width_max=1200),
 ]
 
-# 셋업 시간 매트릭스 (분)
-SETUP_TIME_MATRIX = {
-    ("CLEAR", "CLEAR"): 10,
-    ("CLEAR", "COLOR"): 30,
-    ("COLOR", "CLEAR"): 45,  # 세척 필요
-    ("COLOR", "COLOR"): 20,
-}
+# 색상 ID (그 외 색상은 COLOR_ID_OTHER)
+COLOR_IDS = {"CLEAR": 0, "COLOR": 1}
+COLOR_ID_OTHER = 2
+
+# 셋업 시간 테이블 (분) - SETUP_TIME_TABLE[이전 색상 ID][다음 색상 ID]
+SETUP_TIME_TABLE = (
+    # CLEAR, COLOR, 그 외
+    (10, 30, 30),  # CLEAR →
+    (45, 20, 30),  # COLOR → (CLEAR 전환 시 세척 필요)
+    (30, 30, 30),  # 그 외 →
+)
 
 # 운영 시간
 WORK_START_HOUR = 8
 WORK_END_HOUR = 20
 HOURS_PER_DAY = WORK_END_HOUR - WORK_START_HOUR
 
+# 스케줄 계산용 시간 단위 (마이크로초, timedelta 해상도와 동일)
+US_PER_MINUTE = 60 * 1_000_000
+US_PER_HOUR = 60 * US_PER_MINUTE
+
+# CSV 로드 시 한 번에 읽어 파싱하는 행 수 (파일 전체 행을 메모리에 들고 있지 않음)
+CSV_CHUNK_ROWS = 10_000
+
+
+# ============================================================
+# 배정 커널
+# ============================================================
+
+def _pick_machine(
+    width_mm: int,
+    color_id: int,
+    width_mins: list[int],
+    width_maxs: list[int],
+    max_items: list[int],
+    current_color_ids: list[int],
+    order_counts: list[int],
+) -> tuple[int, int]:
+    """주문을 배정할 기계 인덱스와 셋업 시간 (분)
+
+    폭이 호환되고 품목 수 여유가 있는 기계 중 셋업 시간이 가장 짧은 기계를
+    고른다 (같으면 앞선 기계). 사용 불가 기계는 max_items를 0으로 넘긴다.
+    후보가 없으면 (-1, 0).
+    """
+    best = -1
+    best_setup = 0
+    for k in range(len(width_mins)):
+        if width_mins[k] <= width_mm <= width_maxs[k] and order_counts[k] < max_items[k]:
+            setup = SETUP_TIME_TABLE[current_color_ids[k]][color_id]
+            if best < 0 or setup < best_setup:
+                best = k
+                best_setup = setup
+    return best, best_setup
+
 
 # ============================================================
 # 스케줄러
@@ -134,6 +178,14 @@ class ProductionScheduler:
         """주문 추가"""
         self.orders.extend(orders)
 
+    def reset(self):
+        """주문 초기화 (기계 설정은 유지, 이전 결과가 참조하는 리스트는 건드리지 않음)
+
+        한 스레드가 전용으로 쓰는 인스턴스(서브에이전트의 워커별 스케줄러)를 재사용할
+        때만 쓴다. 실행 중인 다른 작업과 공유하는 인스턴스에서 호출하면 안 된다.
+        """
+        self.orders = []
+
     def get_compatible_machines(self, order: Order) -> list[Machine]:
         """주문에 호환되는 기계 목록"""
         return [
@@ -143,7 +195,9 @@ class ProductionScheduler:
 
     def calculate_setup_time(self, from_color: str, to_color: str) -> int:
         """셋업 시간 계산"""
-        return SETUP_TIME_MATRIX.get((from_color, to_color), 30)
+        return SETUP_TIME_TABLE[COLOR_IDS.get(from_color, COLOR_ID_OTHER)][
+            COLOR_IDS.get(to_color, COLOR_ID_OTHER)
+        ]
 
     def estimate_production_time(self, order: Order, machine: Machine) -> float:
         """생산 시간 추정 (시간)"""
@@ -188,76 +242,62 @@ class ProductionScheduler:
         4. 셋업 시간 고려하여 순서 최적화
         """
         schedule = Schedule(date=target_date)
-
-        # 기계별 현재 상태 추적
-        machine_states = {
-            m.machine_id: {
-                "current_time": datetime.combine(target_date, datetime.min.time().replace(hour=WORK_START_HOUR)),
-                "current_color": m.current_setup or "CLEAR",
-                "orders_today": []
-            }
-            for m in self.machines
-        }
+        machines = self.machines
+
+        # 기계 속성을 병렬 리스트로 변환 (배정 커널 입력)
+        width_mins = [m.width_min for m in machines]
+        width_maxs = [m.width_max for m in machines]
+        max_items = [m.max_items_per_cycle if m.available else 0 for m in machines]
+
+        # 기계별 현재 상태 추적 (시각은 당일 0시 기준 정수 마이크로초)
+        day0 = datetime.combine(target_date, datetime.min.time())
+        work_end_us = WORK_END_HOUR * US_PER_HOUR
+        current_us = [WORK_START_HOUR * US_PER_HOUR] * len(machines)
+        current_color_ids = [
+            COLOR_IDS.get(m.current_setup or "CLEAR", COLOR_ID_OTHER) for m in machines
+        ]
+        order_counts = [0] * len(machines)
 
         # 주문 정렬
         sorted_orders = self.sort_orders_for_scheduling(self.orders)
 
         for order in sorted_orders:
-            scheduled = False
-            compatible_machines = self.get_compatible_machines(order)
-
-            if not compatible_machines:
-                schedule.unscheduled_orders.append(order)
-                continue
-
             # 가장 적합한 기계 선택 (셋업 시간 최소화)
-            best_machine = None
-            best_setup_time = float('inf')
-
-            for machine in compatible_machines:
-                state = machine_states[machine.machine_id]
-                setup_time = self.calculate_setup_time(state["current_color"], order.color)
-
-                # 기계별 조합 품목 수 제한 확인
-                if len(state["orders_today"]) >= machine.max_items_per_cycle:
-                    continue
-
-                if setup_time < best_setup_time:
-                    best_setup_time = setup_time
-                    best_machine = machine
+            k, setup_time = _pick_machine(
+                order.width_mm, order.color_id,
+                width_mins, width_maxs, max_items, current_color_ids, order_counts,
+            )
 
-            if best_machine is None:
+            if k < 0:
                 schedule.unscheduled_orders.append(order)
                 continue
 
             # 스케줄 할당
-            state = machine_states[best_machine.machine_id]
-            production_time = self.estimate_production_time(order, best_machine)
+            machine = machines[k]
+            production_time = self.estimate_production_time(order, machine)
 
-            start_time = state["current_time"] + timedelta(minutes=best_setup_time)
-            end_time = start_time + timedelta(hours=production_time)
+            start_us = current_us[k] + setup_time * US_PER_MINUTE
+            end_us = start_us + round(production_time * US_PER_HOUR)
 
             # 근무 시간 초과 확인
-            work_end = datetime.combine(target_date, datetime.min.time().replace(hour=WORK_END_HOUR))
-            if end_time > work_end:
+            if end_us > work_end_us:
                 schedule.unscheduled_orders.append(order)
                 continue
 
-            # 슬롯 생성
+            # 슬롯 생성 (datetime 변환은 배정된 슬롯에서만)
             slot = ScheduleSlot(
-                machine_id=best_machine.machine_id,
+                machine_id=machine.machine_id,
                 orders=[order],
-                start_time=start_time,
-                end_time=end_time,
-                setup_time_min=best_setup_time
+                start_time=day0 + timedelta(microseconds=start_us),
+                end_time=day0 + timedelta(microseconds=end_us),
+                setup_time_min=setup_time
             )
             schedule.add_slot(slot)
 
             # 상태 업데이트
-            state["current_time"] = end_time
-            state["current_color"] = order.color
-            state["orders_today"].append(order.order_id)
-            scheduled = True
+            current_us[k] = end_us
+            current_color_ids[k] = order.color_id
+            order_counts[k] += 1
 
         return schedule
 
@@ -271,6 +311,8 @@ class ProductionScheduler:
         # - 2-opt, 3-opt 지역 탐색
         # - 시뮬레이티드 어닐링
         # - 유전 알고리즘
+        # 구현 시 Order/Machine 객체 대신 병렬 리스트(폭, 색상 ID, 마이크로초 시각)를
+        # 입력으로 받는 모듈 수준 숫자 커널로 작성한다 (_pick_machine 참고).
         return schedule
 
 
@@ -390,36 +432,87 @@ def load_orders_from_csv(filepath: str) -> list[Order]:
     CSV 형식:
     order_id,product_code,width_mm,quantity_rolls,due_date,color,priority
     """
-    orders = []
     path = Path(filepath)
 
     if not path.exists():
         raise FileNotFoundError(f"주문 파일을 찾을 수 없습니다: {filepath}")
 
-    with open(path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-
-        for row in reader:
-            order = Order(
-                order_id=row['order_id'],
-                product_code=row['product_code'],
-                width_mm=int(row['width_mm']),
-                quantity_rolls=int(row['quantity_rolls']),
-                due_date=row['due_date'],
-                color=row.get('color', 'CLEAR'),
-                priority=int(row.get('priority', 1))
-            )
-            orders.append(order)
+    def column(name: str, convert=None, default=None):
+        """현재 청크에서 열 하나를 추출해 일괄 변환 (default가 있으면 선택 열)"""
+        i = col[name] if default is None else col.get(name)
+        if i is None:
+            return repeat(default)
+        values = [row[i] for row in rows]
+        return list(map(convert, values)) if convert else values
+
+    orders: list[Order] = []
+    # 납기는 같은 날짜가 반복되므로 고유값만 파싱해 공유한다 (datetime은 불변).
+    # fromisoformat은 C 구현이라 YYYY-MM-DD를 int 슬라이스로 직접 파싱하는 것보다 빠르다.
+    due_dates: dict[str, datetime] = {}
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        col = {name: i for i, name in enumerate(next(reader, []))}
+
+        # CSV_CHUNK_ROWS행씩 열 단위로 파싱한 뒤 (SoA) Order로 조립 (AoS)
+        while chunk := list(islice(reader, CSV_CHUNK_ROWS)):
+            rows = [row for row in chunk if row]
+
+            due_strs = column('due_date')
+            for s in set(due_strs).difference(due_dates):
+                due_dates[s] = datetime.fromisoformat(s)
+
+            orders.extend(map(
+                Order,
+                column('order_id'),
+                column('product_code'),
+                column('width_mm', int),
+                column('quantity_rolls', int),
+                map(due_dates.__getitem__, due_strs),
+                column('color', default='CLEAR'),
+                column('priority', int, 1),
+            ))
 
     return orders
 
 
+def orders_from_records(records: list[dict]) -> list[Order]:
+    """dict 목록(에이전트 직접 입력)에서 주문 생성
+
+    load_orders_from_csv와 같이 열 단위로 추출한 뒤 한 번에 조립한다.
+    필수 키: order_id, product_code, width_mm, quantity_rolls, due_date
+    """
+    def column(key: str, default=None):
+        """키 하나를 추출 (default가 있으면 선택 키)
+
+        선택 키도 보통 모든 레코드에 있으므로 먼저 직접 인덱싱하고,
+        빠진 레코드가 있을 때만 .get으로 다시 추출한다 (입력 dict는 수정하지 않음).
+        """
+        try:
+            return [r[key] for r in records]
+        except KeyError:
+            if default is None:
+                raise
+            return [r.get(key, default) for r in records]
+
+    return list(map(
+        Order,
+        column('order_id'),
+        column('product_code'),
+        column('width_mm'),
+        column('quantity_rolls'),
+        column('due_date'),
+        column('color', 'CLEAR'),
+        column('priority', 1),
+    ))
+
+
 # ============================================================
 # 메인
 # ============================================================
 
-def main():
-    """메인 함수"""
+def _build_parser():
+    """CLI 인자 파서 구성"""
     import argparse
 
     parser = argparse.ArgumentParser(description="세영화학 생산 스케줄러")
@@ -428,8 +521,20 @@ def main():
     parser.add_argument("--output", type=str, default="outputs/schedules", help="출력 디렉토리")
     parser.add_argument("--format", choices=["md", "json", "both"], default="both", help="출력 포맷")
     parser.add_argument("--demo", action="store_true", help="데모 모드 (샘플 데이터)")
+    return parser
+
+
+# 파서는 처음 main()에서 한 번 만들어 재사용한다 (라이브러리로 import할 때는 만들지 않음)
+_PARSER = None
+
+
+def main():
+    """메인 함수"""
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = _build_parser()
 
-    args = parser.parse_args()
+    args = _PARSER.parse_args()
 
     # 날짜 설정
     if args.date:
@@ -471,11 +576,12 @@ def main():
     os.makedirs(args.output, exist_ok=True)
 
     date_str = target_date.strftime("%Y%m%d")
+    md = format_schedule_markdown(schedule)  # 파일 저장과 콘솔 출력에 같이 사용
 
     if args.format in ["md", "both"]:
         md_path = os.path.join(args.output, f"schedule-{date_str}.md")
         with open(md_path, "w", encoding="utf-8") as f:
-            f.write(format_schedule_markdown(schedule))
+            f.write(md)
         print(f"\n📄 마크다운 저장: {md_path}")
 
     if args.format in ["json", "both"]:
@@ -486,7 +592,7 @@ def main():
 
     # 콘솔 출력
     print("\n" + "="*60)
-    print(format_schedule_markdown(schedule))
+    print(md)
 
 
 if __name__ == "__main__":
@@ -8,24 +8,40 @@ DeliveryOptimizerAgent - 배송 경로 최적화 에이전트
 """
 
 import sys
-import json
+import asyncio
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 # 프레임워크 경로 추가
-sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+_ROOT = str(Path(__file__).parent.parent.parent.parent)
+if _ROOT not in sys.path:  # 여러 모듈이 같은 경로를 중복 추가하지 않도록
+    sys.path.insert(0, _ROOT)
 
 from scripts.framework.agents import BaseAgent, AgentResponse
-from scripts.optimizers.delivery_router import (
-    DeliveryRouter,
-    Shipment,
-    RoutePlan,
-    load_shipments_from_csv,
-    create_sample_shipments,
-    format_plan_markdown,
-    format_plan_json,
-)
+from scripts.project.report_io import encode_json, write_report
+
+if TYPE_CHECKING:
+    from scripts.optimizers.delivery_router import Shipment, RoutePlan
+
+
+def _run_pipeline(shipments: "list[Shipment]", target_date: datetime) -> "RoutePlan":
+    """경로 생성 + 최적화
+
+    워커 스레드에서 실행되므로 라우터를 호출마다 새로 만들어 쓴다 (같은 에이전트의
+    invoke가 동시에 실행돼도 서로의 출하를 건드리지 않도록). 그래서 에이전트는 라우터를
+    속성으로 두고 reset()해 재사용하지 않는다 (reset()은 워커별 라우터를 두는
+    서브에이전트만 쓴다).
+    """
+    from scripts.optimizers.delivery_router import DeliveryRouter
+
+    router = DeliveryRouter()
+    router.add_shipments(shipments)
+    plan = router.create_plan(target_date)
+    # 배정된 경로가 없으면 최적화할 것이 없으므로 호출하지 않는다 (빈 입력)
+    if not plan.routes:
+        return plan
+    return router.optimize_plan(plan)
 
 
 class DeliveryOptimizerAgent(BaseAgent):
@@ -46,7 +62,6 @@ class DeliveryOptimizerAgent(BaseAgent):
 
     def __init__(self):
         super().__init__(name="DeliveryOptimizer")
-        self.router = DeliveryRouter()
 
     async def invoke(self, input_data: dict) -> AgentResponse:
         """
@@ -58,12 +73,22 @@ class DeliveryOptimizerAgent(BaseAgent):
                 'shipments': list[dict] (직접 출하 데이터),
                 'target_date': str (YYYY-MM-DD, 없으면 오늘),
                 'output_dir': str (출력 디렉토리),
-                'output_format': str ('md', 'json', 'both')
+                'output_format': str ('md', 'json', 'both'),
+                'include_detail': bool (결과에 plan_json 포함 여부, 기본 True)
             }
 
         Returns:
             AgentResponse: 최적화된 경로 결과
         """
+        # 최적화 모듈은 처음 실행할 때 로드한다 (패키지 import 시간 단축)
+        from scripts.optimizers.delivery_router import (
+            shipments_from_records,
+            load_shipments_from_csv,
+            create_sample_shipments,
+            format_plan_markdown,
+            format_plan_json,
+        )
+
         job_id = input_data.get('job_id', f"route-{datetime.now().strftime('%Y%m%d%H%M%S')}")
         self.log_start(job_id, "배송 경로 최적화 시작")
 
@@ -74,6 +99,7 @@ class DeliveryOptimizerAgent(BaseAgent):
             target_date_str = input_data.get('target_date')
             output_dir = input_data.get('output_dir', 'outputs/routes')
             output_format = input_data.get('output_format', 'both')
+            include_detail = input_data.get('include_detail', True)
 
             # 2. 날짜 파싱
             if target_date_str:
@@ -81,82 +107,75 @@ class DeliveryOptimizerAgent(BaseAgent):
             else:
                 target_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
-            self.log_progress(job_id, f"배송 날짜: {target_date.strftime('%Y-%m-%d')}")
+            # 날짜 문자열은 한 번만 만들어 로그/파일명/결과에 재사용
+            date_iso = target_date.strftime('%Y-%m-%d')
+            date_compact = date_iso.replace('-', '')
+            self.log_progress(job_id, f"배송 날짜: {date_iso}")
 
             # 3. 출하 로드
             if shipments_data:
                 # 직접 전달된 출하 데이터
-                shipments = [
-                    Shipment(
-                        shipment_id=s['shipment_id'],
-                        customer=s['customer'],
-                        address=s['address'],
-                        weight_kg=float(s['weight_kg']),
-                        pallets=int(s.get('pallets', 1)),
-                        time_window=s.get('time_window', 'ANY'),
-                        lat=float(s.get('lat', 0)),
-                        lon=float(s.get('lon', 0)),
-                    )
-                    for s in shipments_data
-                ]
+                shipments = shipments_from_records(shipments_data)
                 self.log_progress(job_id, f"직접 전달된 출하: {len(shipments)}건")
             elif shipments_file:
-                shipments = load_shipments_from_csv(shipments_file)
+                # 파일 읽기/파싱은 워커 스레드에서 (이벤트 루프를 막지 않도록)
+                shipments = await asyncio.to_thread(load_shipments_from_csv, shipments_file)
                 self.log_progress(job_id, f"CSV 로드 완료: {len(shipments)}건")
             else:
                 shipments = create_sample_shipments()
                 self.log_progress(job_id, f"데모 모드: 샘플 출하 {len(shipments)}건")
 
-            # 4. 라우터 초기화 및 실행
-            self.router = DeliveryRouter()
-            self.router.add_shipments(shipments)
-
-            plan = self.router.create_plan(target_date)
-            plan = self.router.optimize_plan(plan)
+            # 4. 경로 생성 (CPU 작업은 워커 스레드에서 실행해 이벤트 루프를 막지 않는다)
+            plan = await asyncio.to_thread(_run_pipeline, shipments, target_date)
 
             summary = plan.summary()
             self.log_progress(job_id, f"경로 생성 완료: {summary['total_shipments']}건 배송, {summary['vehicles_used']}대 차량")
 
-            # 5. 결과 저장
-            output_path = Path(output_dir)
-            output_path.mkdir(parents=True, exist_ok=True)
+            # 상세 JSON은 결과에 포함하거나 JSON 파일로 저장할 때만 만든다
+            plan_json = None
+            if include_detail or output_format in ['json', 'both']:
+                plan_json = format_plan_json(plan)
 
-            date_str = target_date.strftime("%Y%m%d")
-            saved_files = []
+            # 5. 결과 저장 (내용 생성 후 파일 쓰기는 워커 스레드에서 동시에)
+            output_path = Path(output_dir)
+            outputs = []
 
             if output_format in ['md', 'both']:
-                md_path = output_path / f"route-{date_str}.md"
-                md_path.write_text(format_plan_markdown(plan), encoding='utf-8')
-                saved_files.append(str(md_path))
+                md_path = output_path / f"route-{date_compact}.md"
+                outputs.append((md_path, format_plan_markdown(plan)))
 
             if output_format in ['json', 'both']:
-                json_path = output_path / f"route-{date_str}.json"
-                json_path.write_text(
-                    json.dumps(format_plan_json(plan), ensure_ascii=False, indent=2),
-                    encoding='utf-8'
-                )
-                saved_files.append(str(json_path))
+                json_path = output_path / f"route-{date_compact}.json"
+                outputs.append((json_path, encode_json(plan_json)))
+
+            await asyncio.to_thread(output_path.mkdir, parents=True, exist_ok=True)
+            await asyncio.gather(*(
+                asyncio.to_thread(write_report, path, content)
+                for path, content in outputs
+            ))
+            saved_files = [str(path) for path, _ in outputs]
 
             # 6. 결과 반환
             result_data = {
-                'plan_date': target_date.strftime('%Y-%m-%d'),
+                'plan_date': date_iso,
                 'total_shipments': summary['total_shipments'],
                 'unassigned_shipments': summary['unassigned_shipments'],
                 'vehicles_used': summary['vehicles_used'],
                 'total_distance_km': summary['total_distance_km'],
                 'total_cost': summary['total_cost'],
                 'saved_files': saved_files,
-                'plan_json': format_plan_json(plan),
             }
+            if include_detail:
+                result_data['plan_json'] = plan_json
 
-            # 비용 절감 추정 (기준선: 단순 왕복)
-            baseline_cost = len(shipments) * 100000  # 개별 배송 시 평균 10만원 가정
+            # 비용 절감 추정 (기준선: 단순 왕복, 개별 배송 시 평균 10만원 가정)
+            baseline_cost = len(shipments) * 100_000
             savings = baseline_cost - summary['total_cost']
-            savings_pct = (savings / baseline_cost * 100) if baseline_cost > 0 else 0
+            savings_pct = round(savings / baseline_cost * 100, 1) if shipments else 0
 
             result_data['baseline_cost'] = baseline_cost
             result_data['savings'] = savings
-            result_data['savings_pct'] = round(savings_pct, 1)
+            result_data['savings_pct'] = savings_pct
 
             if savings > 0:
                 self.log_progress(job_id, f"💰 예상 절감: {savings:,}원 ({savings_pct:.1f}%)")
@@ -207,8 +226,8 @@ class DeliveryOptimizerAgent(BaseAgent):
 # CLI 인터페이스
 # ============================================================
 
-async def main():
-    """CLI 메인 함수"""
+def _build_parser():
+    """CLI 인자 파서 구성"""
     import argparse
 
     parser = argparse.ArgumentParser(description="배송 경로 최적화 에이전트")
@@ -217,8 +236,20 @@ async def main():
     parser.add_argument("--output", type=str, default="outputs/routes", help="출력 디렉토리")
     parser.add_argument("--format", choices=["md", "json", "both"], default="both")
     parser.add_argument("--demo", action="store_true", help="데모 모드")
+    return parser
+
+
+# 파서는 처음 main()에서 한 번 만들어 재사용한다 (라이브러리로 import할 때는 만들지 않음)
+_PARSER = None
+
+
+async def main():
+    """CLI 메인 함수"""
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = _build_parser()
 
-    args = parser.parse_args()
+    args = _PARSER.parse_args()
 
     agent = DeliveryOptimizerAgent()
 
@@ -253,5 +284,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -10,22 +10,40 @@ ProductionPlannerAgent - 생산 스케줄링 에이전트
 """
 
 import sys
+import asyncio
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 # 프레임워크 경로 추가
-sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+_ROOT = str(Path(__file__).parent.parent.parent.parent)
+if _ROOT not in sys.path:  # 여러 모듈이 같은 경로를 중복 추가하지 않도록
+    sys.path.insert(0, _ROOT)
 
 from scripts.framework.agents import BaseAgent, AgentResponse
-from scripts.optimizers.production_scheduler import (
-    ProductionScheduler,
-    Order,
-    load_orders_from_csv,
-    create_sample_orders,
-    format_schedule_markdown,
-    format_schedule_json,
-)
+from scripts.project.report_io import encode_json, write_report
+
+if TYPE_CHECKING:
+    from scripts.optimizers.production_scheduler import Order, Schedule
+
+
+def _run_pipeline(orders: "list[Order]", target_date: datetime) -> "Schedule":
+    """스케줄 생성 + 최적화
+
+    워커 스레드에서 실행되므로 스케줄러를 호출마다 새로 만들어 쓴다 (같은 에이전트의
+    invoke가 동시에 실행돼도 서로의 주문을 건드리지 않도록). 그래서 에이전트는 스케줄러를
+    속성으로 두고 reset()해 재사용하지 않는다 (reset()은 워커별 스케줄러를 두는
+    서브에이전트만 쓴다).
+    """
+    from scripts.optimizers.production_scheduler import ProductionScheduler
+
+    scheduler = ProductionScheduler()
+    scheduler.add_orders(orders)
+    schedule = scheduler.create_schedule(target_date)
+    # 배정된 슬롯이 없으면 최적화할 것이 없으므로 호출하지 않는다 (빈 입력)
+    if not schedule.slots:
+        return schedule
+    return scheduler.optimize_schedule(schedule)
 
 
 class ProductionPlannerAgent(BaseAgent):
@@ -46,7 +64,6 @@ class ProductionPlannerAgent(BaseAgent):
 
     def __init__(self):
         super().__init__(name="ProductionPlanner")
-        self.scheduler = ProductionScheduler()
 
     async def invoke(self, input_data: dict) -> AgentResponse:
         """
@@ -58,12 +75,22 @@ class ProductionPlannerAgent(BaseAgent):
                 'orders': list[dict] (직접 주문 데이터),
                 'target_date': str (YYYY-MM-DD, 없으면 오늘),
                 'output_dir': str (출력 디렉토리),
-                'output_format': str ('md', 'json', 'both')
+                'output_format': str ('md', 'json', 'both'),
+                'include_detail': bool (결과에 schedule_json 포함 여부, 기본 True)
             }
 
         Returns:
             AgentResponse: 스케줄 결과
         """
+        # 최적화 모듈은 처음 실행할 때 로드한다 (패키지 import 시간 단축)
+        from scripts.optimizers.production_scheduler import (
+            orders_from_records,
+            load_orders_from_csv,
+            create_sample_orders,
+            format_schedule_markdown,
+            format_schedule_json,
+        )
+
         job_id = input_data.get('job_id', f"schedule-{datetime.now().strftime('%Y%m%d%H%M%S')}")
         self.log_start(job_id, "생산 스케줄 생성 시작")
 
@@ -74,6 +101,7 @@ class ProductionPlannerAgent(BaseAgent):
             target_date_str = input_data.get('target_date')
             output_dir = input_data.get('output_dir', 'outputs/schedules')
             output_format = input_data.get('output_format', 'both')
+            include_detail = input_data.get('include_detail', True)
 
             # 2. 날짜 파싱
             if target_date_str:
@@ -81,72 +109,65 @@ class ProductionPlannerAgent(BaseAgent):
             else:
                 target_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
-            self.log_progress(job_id, f"대상 날짜: {target_date.strftime('%Y-%m-%d')}")
+            # 날짜 문자열은 한 번만 만들어 로그/파일명/결과에 재사용
+            date_iso = target_date.strftime('%Y-%m-%d')
+            date_compact = date_iso.replace('-', '')
+            self.log_progress(job_id, f"대상 날짜: {date_iso}")
 
             # 3. 주문 로드
             if orders_data:
                 # 직접 전달된 주문 데이터
-                orders = [
-                    Order(
-                        order_id=o['order_id'],
-                        product_code=o['product_code'],
-                        width_mm=o['width_mm'],
-                        quantity_rolls=o['quantity_rolls'],
-                        due_date=o['due_date'],
-                        color=o.get('color', 'CLEAR'),
-                        priority=o.get('priority', 1)
-                    )
-                    for o in orders_data
-                ]
+                orders = orders_from_records(orders_data)
                 self.log_progress(job_id, f"직접 전달된 주문: {len(orders)}건")
             elif orders_file:
-                orders = load_orders_from_csv(orders_file)
+                # 파일 읽기/파싱은 워커 스레드에서 (이벤트 루프를 막지 않도록)
+                orders = await asyncio.to_thread(load_orders_from_csv, orders_file)
                 self.log_progress(job_id, f"CSV 로드 완료: {len(orders)}건")
             else:
                 orders = create_sample_orders()
                 self.log_progress(job_id, f"데모 모드: 샘플 주문 {len(orders)}건")
 
-            # 4. 스케줄러 초기화 및 실행
-            self.scheduler = ProductionScheduler()
-            self.scheduler.add_orders(orders)
+            # 4. 스케줄 생성 (CPU 작업은 워커 스레드에서 실행해 이벤트 루프를 막지 않는다)
+            schedule = await asyncio.to_thread(_run_pipeline, orders, target_date)
 
-            schedule = self.scheduler.create_schedule(target_date)
-            schedule = self.scheduler.optimize_schedule(schedule)
+            summary = schedule.summary()
+            self.log_progress(job_id, f"스케줄 생성 완료: {summary['total_orders']}건 배정")
 
-            self.log_progress(job_id, f"스케줄 생성 완료: {schedule.summary()['total_orders']}건 배정")
+            # 상세 JSON은 결과에 포함하거나 JSON 파일로 저장할 때만 만든다
+            schedule_json = None
+            if include_detail or output_format in ['json', 'both']:
+                schedule_json = format_schedule_json(schedule)
 
-            # 5. 결과 저장
+            # 5. 결과 저장 (내용 생성 후 파일 쓰기는 워커 스레드에서 동시에)
             output_path = Path(output_dir)
-            output_path.mkdir(parents=True, exist_ok=True)
-
-            date_str = target_date.strftime("%Y%m%d")
-            saved_files = []
+            outputs = []
 
             if output_format in ['md', 'both']:
-                md_path = output_path / f"schedule-{date_str}.md"
-                md_path.write_text(format_schedule_markdown(schedule), encoding='utf-8')
-                saved_files.append(str(md_path))
+                md_path = output_path / f"schedule-{date_compact}.md"
+                outputs.append((md_path, format_schedule_markdown(schedule)))
 
             if output_format in ['json', 'both']:
-                json_path = output_path / f"schedule-{date_str}.json"
-                import json
-                json_path.write_text(
-                    json.dumps(format_schedule_json(schedule), ensure_ascii=False, indent=2),
-                    encoding='utf-8'
-                )
-                saved_files.append(str(json_path))
+                json_path = output_path / f"schedule-{date_compact}.json"
+                outputs.append((json_path, encode_json(schedule_json)))
+
+            await asyncio.to_thread(output_path.mkdir, parents=True, exist_ok=True)
+            await asyncio.gather(*(
+                asyncio.to_thread(write_report, path, content)
+                for path, content in outputs
+            ))
+            saved_files = [str(path) for path, _ in outputs]
 
             # 6. 결과 반환
-            summary = schedule.summary()
             result_data = {
-                'schedule_date': target_date.strftime('%Y-%m-%d'),
+                'schedule_date': date_iso,
                 'total_orders': summary['total_orders'],
                 'unscheduled_orders': summary['unscheduled_orders'],
                 'machines_used': summary['machines_used'],
                 'total_setup_time_min': summary['total_setup_time_min'],
                 'saved_files': saved_files,
-                'schedule_json': format_schedule_json(schedule),
             }
+            if include_detail:
+                result_data['schedule_json'] = schedule_json
 
             # 미배정 주문이 있으면 경고 포함
             if summary['unscheduled_orders'] > 0:
@@ -192,8 +213,8 @@ class ProductionPlannerAgent(BaseAgent):
 # CLI 인터페이스
 # ============================================================
 
-async def main():
-    """CLI 메인 함수"""
+def _build_parser():
+    """CLI 인자 파서 구성"""
     import argparse
 
     parser = argparse.ArgumentParser(description="생산 스케줄링 에이전트")
@@ -202,8 +223,20 @@ async def main():
     parser.add_argument("--output", type=str, default="outputs/schedules", help="출력 디렉토리")
     parser.add_argument("--format", choices=["md", "json", "both"], default="both")
     parser.add_argument("--demo", action="store_true", help="데모 모드")
+    return parser
+
+
+# 파서는 처음 main()에서 한 번 만들어 재사용한다 (라이브러리로 import할 때는 만들지 않음)
+_PARSER = None
+
+
+async def main():
+    """CLI 메인 함수"""
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = _build_parser()
 
-    args = parser.parse_args()
+    args = _PARSER.parse_args()
 
     agent = ProductionPlannerAgent()
 
@@ -234,5 +267,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -11,12 +11,17 @@ FactorySupervisorAgent - 스마트팩토리 총괄 에이전트
 """
 
 import sys
-import json
+import atexit
+import asyncio
+import threading
+from concurrent.futures import Executor
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, Optional
 
-sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+_ROOT = str(Path(__file__).parent.parent.parent.parent)
+if _ROOT not in sys.path:  # 여러 모듈이 같은 경로를 중복 추가하지 않도록
+    sys.path.insert(0, _ROOT)
 
 from scripts.framework.agents import (
     BaseAgent,
@@ -28,10 +33,7 @@ from scripts.framework.agents import (
     SubAgentRegistry,
     ClusterResult,
 )
-from scripts.project.subagents import (
-    ProductionPlannerSubAgent,
-    DeliveryOptimizerSubAgent,
-)
+from scripts.project.report_io import encode_json, write_report
 
 
 class FactorySupervisorAgent(BaseAgent):
@@ -47,21 +49,73 @@ class FactorySupervisorAgent(BaseAgent):
             'orders_file': 'data/orders.csv',
             'shipments_file': 'data/shipments.csv',
         })
+
+    서브에이전트 계산용 executor는 인스턴스마다 정한다. 기본값은 모든 인스턴스가
+    공유하는 프로세스 전역 ProcessPoolExecutor(max_workers=2)이며, 서버 등에서 직접
+    관리하려면 FactorySupervisorAgent(pool=my_executor)로 넘긴다 (종료는 호출자 책임).
+    기본 풀은 spawn 방식이므로 실행 스크립트는 if __name__ == "__main__": 가드가 필요하다.
     """
 
-    def __init__(self):
+    # SubAgentRegistry는 전역이므로 서브에이전트는 프로세스당 한 번만 만들어 등록하고
+    # 모든 인스턴스가 공유한다 (요청마다 생성해도 재등록하지 않음). executor는 서브에이전트에
+    # 묶지 않고 실행할 때 입력으로 넘긴다.
+    # 기본 풀은 인스턴스가 닫지 않고 shutdown_pool()로만 닫는다 (프로세스 종료 시 자동 호출)
+    _init_lock = threading.Lock()
+    _pool = None
+    _subagents: Optional[tuple] = None
+    _atexit_registered = False
+
+    def __init__(self, pool: Optional[Executor] = None):
+        """
+        Args:
+            pool: 이 인스턴스의 서브에이전트 최적화 계산에 쓸 executor
+                (없으면 공유 기본 프로세스 풀, 다른 인스턴스에는 영향 없음)
+        """
         super().__init__(name="FactorySupervisor")
         self.executor = ParallelExecutor(max_concurrent=2)
+        self.pool = pool
         self._init_subagents()
 
     def _init_subagents(self):
-        """서브에이전트 초기화 및 등록"""
-        self.production_subagent = ProductionPlannerSubAgent()
-        self.delivery_subagent = DeliveryOptimizerSubAgent()
+        """서브에이전트 초기화 및 등록 (최초 1회)"""
+        cls = FactorySupervisorAgent
+        with cls._init_lock:
+            if cls._subagents is None:
+                # 서브에이전트(최적화 모듈 포함)는 처음 쓸 때 로드한다
+                from scripts.project.subagents import (
+                    ProductionPlannerSubAgent,
+                    DeliveryOptimizerSubAgent,
+                )
+
+                cls._subagents = (
+                    ProductionPlannerSubAgent(),
+                    DeliveryOptimizerSubAgent(),
+                )
 
-        SubAgentRegistry.clear()
-        SubAgentRegistry.register(self.production_subagent)
-        SubAgentRegistry.register(self.delivery_subagent)
+                SubAgentRegistry.clear()
+                for subagent in cls._subagents:
+                    SubAgentRegistry.register(subagent)
+
+            self.production_subagent, self.delivery_subagent = cls._subagents
+
+    @classmethod
+    def _default_pool(cls) -> Executor:
+        """공유 기본 프로세스 풀 (처음 쓸 때 생성, shutdown_pool() 이후에는 다시 생성)"""
+        with cls._init_lock:
+            if cls._pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                # 최적화 계산은 순수 파이썬이라 스레드로는 GIL 때문에 겹치지 않는다.
+                # 이 시점에는 to_thread 워커 등 스레드가 이미 있으므로 fork 대신 spawn
+                cls._pool = ProcessPoolExecutor(
+                    max_workers=2,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                if not cls._atexit_registered:
+                    atexit.register(cls.shutdown_pool)
+                    cls._atexit_registered = True
+            return cls._pool
 
     async def invoke(self, input_data: dict) -> AgentResponse:
         """
@@ -120,11 +174,13 @@ class FactorySupervisorAgent(BaseAgent):
 
             self.log_progress(job_id, f"실행 모드: {mode} ({len(subagent_names)}개 서브에이전트)")
 
-            # 병렬 실행
+            # 병렬 실행 - PARALLEL 계획이라 executor가 두 서브에이전트의 execute를 동시에
+            # 기다리고, 최적화 계산은 이 인스턴스의 풀에서 겹쳐 돈다 (소요 ≈ max(생산, 배송))
+            pool = self.pool if self.pool is not None else self._default_pool()
             cluster_result: ClusterResult = await self.executor.execute_plan(
                 ctx=ctx,
                 plan=plan,
-                input_data=input_data
+                input_data={'executor': pool, **input_data}
             )
 
             self.log_progress(
@@ -162,7 +218,7 @@ class FactorySupervisorAgent(BaseAgent):
 
             # 통합 리포트 저장
             saved_files = await self._save_integrated_report(
-                result_data, output_dir, target_date
+                result_data, output_dir, date_str.replace('-', '')
             )
             result_data['saved_files'] = saved_files
 
@@ -196,112 +252,141 @@ class FactorySupervisorAgent(BaseAgent):
                 duration=self._get_duration()
             )
 
+    @classmethod
+    def clear_subagent_cache(cls):
+        """공유 서브에이전트의 지난 실행 결과 캐시 비우기 (모든 인스턴스에 적용)"""
+        with cls._init_lock:
+            subagents = cls._subagents or ()
+        for subagent in subagents:
+            subagent.clear_cache()
+
+    @classmethod
+    def shutdown_pool(cls):
+        """공유 기본 프로세스 풀 종료 (프로세스 종료 시 atexit으로 한 번 호출됨)
+
+        이미 만든 인스턴스도 계속 쓸 수 있다. 기본 풀을 쓰는 인스턴스는 다음 실행에서
+        풀을 다시 만든다. pool=로 넘긴 executor는 건드리지 않는다.
+        """
+        with cls._init_lock:
+            pool, cls._pool = cls._pool, None
+        if pool is not None:
+            pool.shutdown()
+
     async def _save_integrated_report(
         self,
         result_data: dict,
         output_dir: str,
-        target_date: datetime
+        date_compact: str
     ) -> list:
-        """통합 리포트 저장"""
-        saved_files = []
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-
-        date_str = target_date.strftime("%Y%m%d")
+        """통합 리포트 저장
 
-        # JSON 리포트
-        json_path = output_path / f"integrated-report-{date_str}.json"
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(result_data, f, ensure_ascii=False, indent=2, default=str)
-        saved_files.append(str(json_path))
+        내용은 먼저 문자열로 만들고, 파일 쓰기는 워커 스레드에서 동시에 수행해
+        이벤트 루프를 막지 않는다.
+        """
+        output_path = Path(output_dir)
 
-        # 마크다운 요약
-        md_path = output_path / f"integrated-report-{date_str}.md"
+        json_path = output_path / f"integrated-report-{date_compact}.json"  # JSON 리포트
+        md_path = output_path / f"integrated-report-{date_compact}.md"  # 마크다운 요약
+        json_content = encode_json(result_data, default=str)
         md_content = self._format_markdown_report(result_data)
-        with open(md_path, 'w', encoding='utf-8') as f:
-            f.write(md_content)
-        saved_files.append(str(md_path))
 
-        return saved_files
+        await asyncio.to_thread(output_path.mkdir, parents=True, exist_ok=True)
+        await asyncio.gather(
+            asyncio.to_thread(write_report, json_path, json_content),
+            asyncio.to_thread(write_report, md_path, md_content),
+        )
+
+        return [str(json_path), str(md_path)]
 
     def _format_markdown_report(self, result_data: dict) -> str:
         """마크다운 리포트 생성"""
-        lines = [
-            f"# 스마트팩토리 통합 리포트",
-            f"",
-            f"**날짜**: {result_data.get('target_date', 'N/A')}",
-            f"**실행 시간**: {result_data.get('execution_time', 0)}초",
-            f"",
-            "---",
-            "",
-        ]
-
-        # 생산 요약
         production = result_data.get('production', {})
-        if production:
-            summary = production.get('summary', {})
-            lines.extend([
-                "## 📦 생산 스케줄",
-                "",
-                "| 항목 | 값 |",
-                "|------|-----|",
-                f"| 배정 주문 | {summary.get('total_orders', 0)}건 |",
-                f"| 미배정 | {summary.get('unscheduled_orders', 0)}건 |",
-                f"| 사용 기계 | {summary.get('machines_used', 0)}대 |",
-                f"| 총 셋업 시간 | {summary.get('total_setup_time_min', 0)}분 |",
-                "",
-            ])
-
-        # 배송 요약
         delivery = result_data.get('delivery', {})
-        if delivery:
-            summary = delivery.get('summary', {})
-            lines.extend([
-                "## 🚚 배송 계획",
-                "",
-                "| 항목 | 값 |",
-                "|------|-----|",
-                f"| 배송 건수 | {summary.get('total_shipments', 0)}건 |",
-                f"| 사용 차량 | {summary.get('vehicles_used', 0)}대 |",
-                f"| 총 거리 | {summary.get('total_distance_km', 0)}km |",
-                f"| 총 비용 | {summary.get('total_cost', 0):,}원 |",
-                "",
-            ])
-
-        # 통합 KPI
-        lines.extend([
-            "---",
-            "",
-            "## 📊 통합 KPI",
-            "",
-        ])
-
-        prod_orders = production.get('summary', {}).get('total_orders', 0)
-        prod_unscheduled = production.get('summary', {}).get('unscheduled_orders', 0)
-        delivery_cost = delivery.get('summary', {}).get('total_cost', 0)
-
-        if prod_orders + prod_unscheduled > 0:
-            schedule_rate = prod_orders / (prod_orders + prod_unscheduled) * 100
-            lines.append(f"- **생산 배정률**: {schedule_rate:.1f}%")
-
-        if delivery_cost > 0:
-            lines.append(f"- **배송 비용**: {delivery_cost:,}원")
-
-        lines.extend([
-            "",
-            "---",
-            f"*Generated by FactorySupervisorAgent*",
-        ])
-
-        return "\n".join(lines)
+
+        return (
+            f"# 스마트팩토리 통합 리포트\n"
+            f"\n"
+            f"**날짜**: {result_data.get('target_date', 'N/A')}\n"
+            f"**실행 시간**: {result_data.get('execution_time', 0)}초\n"
+            f"\n"
+            f"---\n"
+            f"\n"
+            f"{_fmt_production(production)}"
+            f"{_fmt_delivery(delivery)}"
+            f"---\n"
+            f"\n"
+            f"## 📊 통합 KPI\n"
+            f"\n"
+            f"{_fmt_kpi(production, delivery)}"
+            f"\n"
+            f"---\n"
+            f"*Generated by FactorySupervisorAgent*"
+        )
+
+
+# ============================================================
+# 리포트 섹션 포맷
+# ============================================================
+# 섹션 구조가 고정이라 섹션마다 f-string 템플릿 하나로 특수화해 두었다.
+# string.Template.substitute는 호출마다 정규식 치환을 해 f-string보다 약 7배 느리다.
+
+def _fmt_production(production: dict) -> str:
+    """생산 요약 섹션 (결과가 없으면 빈 문자열)"""
+    if not production:
+        return ""
+    summary = production.get('summary', {})
+    return (
+        f"## 📦 생산 스케줄\n"
+        f"\n"
+        f"| 항목 | 값 |\n"
+        f"|------|-----|\n"
+        f"| 배정 주문 | {summary.get('total_orders', 0)}건 |\n"
+        f"| 미배정 | {summary.get('unscheduled_orders', 0)}건 |\n"
+        f"| 사용 기계 | {summary.get('machines_used', 0)}대 |\n"
+        f"| 총 셋업 시간 | {summary.get('total_setup_time_min', 0)}분 |\n"
+        f"\n"
+    )
+
+
+def _fmt_delivery(delivery: dict) -> str:
+    """배송 요약 섹션 (결과가 없으면 빈 문자열)"""
+    if not delivery:
+        return ""
+    summary = delivery.get('summary', {})
+    return (
+        f"## 🚚 배송 계획\n"
+        f"\n"
+        f"| 항목 | 값 |\n"
+        f"|------|-----|\n"
+        f"| 배송 건수 | {summary.get('total_shipments', 0)}건 |\n"
+        f"| 사용 차량 | {summary.get('vehicles_used', 0)}대 |\n"
+        f"| 총 거리 | {summary.get('total_distance_km', 0)}km |\n"
+        f"| 총 비용 | {summary.get('total_cost', 0):,}원 |\n"
+        f"\n"
+    )
+
+
+def _fmt_kpi(production: dict, delivery: dict) -> str:
+    """통합 KPI 항목 (항목마다 한 줄)"""
+    prod_orders = production.get('summary', {}).get('total_orders', 0)
+    prod_unscheduled = production.get('summary', {}).get('unscheduled_orders', 0)
+    delivery_cost = delivery.get('summary', {}).get('total_cost', 0)
+
+    kpi = ""
+    if prod_orders + prod_unscheduled > 0:
+        schedule_rate = prod_orders / (prod_orders + prod_unscheduled) * 100
+        kpi += f"- **생산 배정률**: {schedule_rate:.1f}%\n"
+    if delivery_cost > 0:
+        kpi += f"- **배송 비용**: {delivery_cost:,}원\n"
+    return kpi
 
 
 # ============================================================
 # CLI 인터페이스
 # ============================================================
 
-async def main():
-    """CLI 메인 함수"""
+def _build_parser():
+    """CLI 인자 파서 구성"""
     import argparse
 
     parser = argparse.ArgumentParser(description="스마트팩토리 통합 에이전트")
@@ -311,8 +396,20 @@ async def main():
     parser.add_argument("--output", type=str, default="outputs", help="출력 디렉토리")
     parser.add_argument("--mode", choices=["all", "production", "delivery"], default="all")
     parser.add_argument("--demo", action="store_true", help="데모 모드")
+    return parser
+
+
+# 파서는 처음 main()에서 한 번 만들어 재사용한다 (라이브러리로 import할 때는 만들지 않음)
+_PARSER = None
+
+
+async def main():
+    """CLI 메인 함수"""
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = _build_parser()
 
-    args = parser.parse_args()
+    args = _PARSER.parse_args()
 
     supervisor = FactorySupervisorAgent()
 
@@ -330,7 +427,10 @@ async def main():
         if args.shipments:
             input_data['shipments_file'] = args.shipments
 
-    result = await supervisor.invoke(input_data)
+    try:
+        result = await supervisor.invoke(input_data)
+    finally:
+        FactorySupervisorAgent.shutdown_pool()
 
     print("\n" + "="*70)
     print("🏭 스마트팩토리 통합 최적화 결과")
@@ -375,5 +475,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+서브에이전트 입력 지문
+
+같은 입력으로 다시 실행됐는지 판단해 이전 결과를 재사용할 때 사용합니다.
+대상 날짜 파싱도 여기서 공유합니다.
+"""
+
+import json
+import hashlib
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional
+
+# 파일 지문을 계산할 때 한 번에 읽는 바이트 수
+FILE_HASH_CHUNK = 1 << 20
+
+
+@lru_cache(maxsize=64)
+def _parse_iso_date(date_str: str) -> datetime:
+    return datetime.fromisoformat(date_str)
+
+
+def parse_target_date(date_str: Optional[str]) -> datetime:
+    """대상 날짜 파싱 (없으면 오늘 0시)
+
+    같은 날짜 문자열은 캐시된 datetime을 돌려준다 (불변이라 공유해도 안전).
+    오늘 날짜는 실행 시점에 따라 바뀌므로 캐시하지 않는다.
+    """
+    if not date_str:
+        return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return _parse_iso_date(date_str)
+
+
+def input_fingerprint(target_date: str, records=None, filepath=None) -> Optional[str]:
+    """입력 지문 (blake2b 16바이트 hex)
+
+    records가 있으면 그 내용을 (입력 순서가 배정 동점 처리에 쓰이므로 정렬하지
+    않는다), 파일이면 파일 내용을, 둘 다 없으면 샘플 데이터가 기준으로 삼는 오늘
+    날짜를 대상 날짜와 함께 해시한다. 수정 시각은 파일시스템에 따라 해상도가 낮아
+    (1~2초) 같은 크기로 덮어쓴 파일을 구분하지 못하므로 쓰지 않는다.
+    파일을 읽을 수 없으면 None을 반환해 로더가 원래 오류를 내도록 한다.
+
+    Args:
+        target_date: 대상 날짜 (YYYY-MM-DD)
+        records: 직접 전달된 dict 목록
+        filepath: CSV 파일 경로
+    """
+    if records:
+        source = ['records', records]
+    elif filepath:
+        try:
+            source = ['file', _file_digest(filepath)]
+        except OSError:
+            return None
+    else:
+        source = ['sample', date.today().isoformat()]
+
+    payload = json.dumps([target_date, source], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _file_digest(filepath) -> str:
+    """파일 내용 해시 (blake2b 16바이트 hex, 블록 단위로 읽음)"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(FILE_HASH_CHUNK), b''):
+            h.update(block)
+    return h.hexdigest()
@@ -0,0 +1,66 @@
+"""
+리포트 직렬화·저장 유틸리티
+
+에이전트들이 결과 파일을 저장할 때 공통으로 사용합니다.
+"""
+
+import os
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson 미설치 환경에서는 표준 json 사용
+    orjson = None
+
+
+def encode_json(data, default=None) -> bytes:
+    """JSON 직렬화 후 UTF-8 바이트로 반환 (들여쓰기 2칸, 한글 그대로)
+
+    orjson이 설치되어 있으면 C 구현이 만든 UTF-8 바이트를 그대로 쓰고
+    (str로 디코딩했다가 저장 때 다시 인코딩하지 않는다), 없으면 표준 json
+    결과를 한 번 인코딩한다. datetime/dataclass도 orjson이 직접 변환하지 않고
+    표준 json처럼 default로 넘긴다. 단, NaN/Infinity는 orjson에서 null,
+    표준 json에서 NaN/Infinity로 출력된다 (리포트 값에는 나오지 않는다).
+
+    Args:
+        data: 직렬화할 객체
+        default: 직렬화할 수 없는 객체 변환 함수 (예: str)
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            default=default,
+            option=(
+                orjson.OPT_INDENT_2
+                | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS
+            ),
+        )
+    return json.dumps(data, ensure_ascii=False, indent=2, default=default).encode('utf-8')
+
+
+def write_report(path, *chunks: str | bytes) -> None:
+    """리포트 파일 저장 (UTF-8)
+
+    str 내용만 인코딩하고 (bytes는 그대로) os.writev 한 번으로 쓴다. 부분 쓰기가 일어나면
+    남은 바이트를 이어서 쓴다. writev가 없는 플랫폼(Windows)에서는 write를 쓴다.
+
+    Args:
+        path: 저장 경로
+        chunks: 파일 내용 (str 또는 미리 인코딩한 bytes, 순서대로 이어 붙인다)
+    """
+    data = [chunk.encode('utf-8') if isinstance(chunk, str) else chunk for chunk in chunks]
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if hasattr(os, 'writev'):
+            written = os.writev(fd, data)
+        else:
+            written = 0
+        # 다 쓰지 못했을 때만 남은 부분을 이어 붙인다 (보통은 복사 없이 끝난다)
+        if written < sum(map(len, data)):
+            rest = memoryview(b''.join(data))[written:]
+            while rest:
+                rest = rest[os.write(fd, rest):]
+    finally:
+        os.close(fd)
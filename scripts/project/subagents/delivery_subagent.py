@@ -5,20 +5,48 @@ SupervisorAgent에서 호출되어 배송 경로를 최적화합니다.
 """
 
 import sys
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor
 from pathlib import Path
+from typing import Optional, TYPE_CHECKING
 
-sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+_ROOT = str(Path(__file__).parent.parent.parent.parent)
+if _ROOT not in sys.path:  # 여러 모듈이 같은 경로를 중복 추가하지 않도록
+    sys.path.insert(0, _ROOT)
 
 from scripts.framework.agents import BaseSubAgent, SubAgentContext, SubAgentResult
-from scripts.optimizers.delivery_router import (
-    DeliveryRouter,
-    Shipment,
-    load_shipments_from_csv,
-    create_sample_shipments,
-    format_plan_json,
-)
+from scripts.project.input_key import input_fingerprint, parse_target_date
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from scripts.optimizers.delivery_router import Shipment, RoutePlan
+
+# 워커(프로세스 풀의 프로세스 또는 스레드)마다 라우터를 하나씩 두고 재사용한다
+_worker = threading.local()
+
+
+def _run_pipeline(shipments: "list[Shipment]", target_date: datetime) -> "RoutePlan":
+    """경로 생성 + 최적화
+
+    프로세스 풀에서도 실행되도록 피클 가능한 입력만 받고, 라우터는 워커에 보관한
+    인스턴스를 reset()해 재사용한다 (설정/캐시 유지).
+    """
+    router = getattr(_worker, 'router', None)
+    if router is None:
+        from scripts.optimizers.delivery_router import DeliveryRouter
+
+        router = _worker.router = DeliveryRouter()
+
+    router.reset()
+    router.add_shipments(shipments)
+    plan = router.create_plan(target_date)
+    # 배정된 경로가 없으면 최적화할 것이 없으므로 호출하지 않는다 (빈 입력)
+    if not plan.routes:
+        return plan
+    return router.optimize_plan(plan)
+
 
 class DeliveryOptimizerSubAgent(BaseSubAgent):
     """
@@ -28,17 +56,36 @@ class DeliveryOptimizerSubAgent(BaseSubAgent):
         - shipments_file: CSV 파일 경로 (옵션)
         - shipments: 출하 리스트 (옵션)
         - target_date: 배송 날짜
+        - executor: 최적화 계산용 executor (옵션, 상위 에이전트가 지정)
 
     출력:
         - plan: 배송 계획 JSON
         - summary: 요약 정보
     """
 
-    def __init__(self):
+    def __init__(self, executor: Optional[Executor] = None):
         super().__init__(name="DeliveryOptimizer", cluster="operations")
+        self.executor = executor  # 입력에 executor가 없을 때 사용 (None이면 기본 스레드 풀)
+        self._last_run: Optional[tuple] = None  # (입력 지문, RoutePlan)
+
+    def clear_cache(self):
+        """지난 실행 결과 캐시 비우기 (다음 실행은 입력이 같아도 다시 최적화)
+
+        입력 밖의 조건(설비/차량 설정, 마스터 데이터 등)이 바뀌었을 때 호출한다.
+        (FactorySupervisorAgent처럼 여러 상위 에이전트가 공유하면 모두에 적용된다)
+        """
+        self._last_run = None
 
     async def execute(self, ctx: SubAgentContext, input_data: dict) -> SubAgentResult:
         """배송 경로 최적화"""
+        # 최적화 모듈은 처음 실행할 때 로드한다 (패키지 import 시간 단축)
+        from scripts.optimizers.delivery_router import (
+            shipments_from_records,
+            load_shipments_from_csv,
+            create_sample_shipments,
+            format_plan_json,
+        )
+
         try:
             # 입력 파싱
             shipments_file = input_data.get('shipments_file')
@@ -46,44 +93,45 @@ class DeliveryOptimizerSubAgent(BaseSubAgent):
             target_date_str = input_data.get('target_date')
 
             # 날짜 파싱
-            if target_date_str:
-                target_date = datetime.fromisoformat(target_date_str)
-            else:
-                target_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-
-            self.logger.info(f"[{ctx.job_id}] 배송 경로 최적화: {target_date.strftime('%Y-%m-%d')}")
-
-            # 출하 로드
-            if shipments_data:
-                shipments = [
-                    Shipment(
-                        shipment_id=s['shipment_id'],
-                        customer=s['customer'],
-                        address=s['address'],
-                        weight_kg=float(s['weight_kg']),
-                        pallets=int(s.get('pallets', 1)),
-                        time_window=s.get('time_window', 'ANY'),
-                        lat=float(s.get('lat', 0)),
-                        lon=float(s.get('lon', 0)),
-                    )
-                    for s in shipments_data
-                ]
-            elif shipments_file:
-                shipments = load_shipments_from_csv(shipments_file)
+            target_date = parse_target_date(target_date_str)
+
+            date_iso = target_date.strftime('%Y-%m-%d')
+            self.logger.info("[%s] 배송 경로 최적화: %s", ctx.job_id, date_iso)
+
+            # 입력이 지난 실행과 같으면 로드/최적화 없이 이전 계획 재사용
+            # (지문 계산은 레코드 직렬화가 커질 수 있어 워커 스레드에서)
+            key = await asyncio.to_thread(input_fingerprint, date_iso, shipments_data, shipments_file)
+            last = self._last_run
+            if key is not None and last is not None and last[0] == key:
+                self.logger.info("[%s] 입력 변경 없음 - 이전 배송 계획 재사용", ctx.job_id)
+                plan = last[1]
             else:
-                shipments = create_sample_shipments()
-
-            # 경로 최적화
-            router = DeliveryRouter()
-            router.add_shipments(shipments)
-
-            plan = router.create_plan(target_date)
-            plan = router.optimize_plan(plan)
-
+                # 출하 로드
+                # 레코드 변환/파일 파싱은 워커 스레드에서 (이벤트 루프를 막지 않도록)
+                if shipments_data:
+                    shipments = await asyncio.to_thread(shipments_from_records, shipments_data)
+                elif shipments_file:
+                    shipments = await asyncio.to_thread(load_shipments_from_csv, shipments_file)
+                else:
+                    shipments = create_sample_shipments()
+
+                # 경로 최적화 (CPU 작업은 executor에서 실행해 다른 서브에이전트와 겹치게 한다)
+                loop = asyncio.get_running_loop()
+                executor = input_data.get('executor') or self.executor
+                plan = await loop.run_in_executor(executor, _run_pipeline, shipments, target_date)
+                self._last_run = (key, plan)
+
+            # 결과 dict는 매번 새로 만든다 (호출자가 결과를 수정해도 캐시된 계획은 그대로)
             plan_json = format_plan_json(plan)
-            summary = plan.summary()
+            # format_plan_json이 이미 계산한 요약 재사용 (plan_json 안의 dict와 공유하지 않도록 복사)
+            summary = dict(plan_json['summary'])
 
-            self.logger.info(f"[{ctx.job_id}] 배송 배정: {summary['total_shipments']}건, 비용: {summary['total_cost']:,}원")
+            # 로그 메시지는 INFO가 켜져 있을 때만 포맷한다 (천 단위 구분은 %-포맷으로 불가)
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    "[%s] 배송 배정: %d건, 비용: %s원",
+                    ctx.job_id, summary['total_shipments'], f"{summary['total_cost']:,}"
+                )
 
             return SubAgentResult(
                 agent_name=self.name,
@@ -98,7 +146,7 @@ class DeliveryOptimizerSubAgent(BaseSubAgent):
             )
 
         except Exception as e:
-            self.logger.error(f"[{ctx.job_id}] 배송 최적화 실패: {e}")
+            self.logger.error("[%s] 배송 최적화 실패: %s", ctx.job_id, e)
             return SubAgentResult(
                 agent_name=self.name,
                 status="error",
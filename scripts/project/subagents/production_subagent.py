@@ -5,20 +5,47 @@ SupervisorAgent에서 호출되어 생산 일정을 최적화합니다.
 """
 
 import sys
+import asyncio
+import threading
+from concurrent.futures import Executor
 from pathlib import Path
+from typing import Optional, TYPE_CHECKING
 
-sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+_ROOT = str(Path(__file__).parent.parent.parent.parent)
+if _ROOT not in sys.path:  # 여러 모듈이 같은 경로를 중복 추가하지 않도록
+    sys.path.insert(0, _ROOT)
 
 from scripts.framework.agents import BaseSubAgent, SubAgentContext, SubAgentResult
-from scripts.optimizers.production_scheduler import (
-    ProductionScheduler,
-    Order,
-    load_orders_from_csv,
-    create_sample_orders,
-    format_schedule_json,
-)
+from scripts.project.input_key import input_fingerprint, parse_target_date
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from scripts.optimizers.production_scheduler import Order, Schedule
+
+# 워커(프로세스 풀의 프로세스 또는 스레드)마다 스케줄러를 하나씩 두고 재사용한다
+_worker = threading.local()
+
+
+def _run_pipeline(orders: "list[Order]", target_date: datetime) -> "Schedule":
+    """스케줄 생성 + 최적화
+
+    프로세스 풀에서도 실행되도록 피클 가능한 입력만 받고, 스케줄러는 워커에 보관한
+    인스턴스를 reset()해 재사용한다 (설정/캐시 유지).
+    """
+    scheduler = getattr(_worker, 'scheduler', None)
+    if scheduler is None:
+        from scripts.optimizers.production_scheduler import ProductionScheduler
+
+        scheduler = _worker.scheduler = ProductionScheduler()
+
+    scheduler.reset()
+    scheduler.add_orders(orders)
+    schedule = scheduler.create_schedule(target_date)
+    # 배정된 슬롯이 없으면 최적화할 것이 없으므로 호출하지 않는다 (빈 입력)
+    if not schedule.slots:
+        return schedule
+    return scheduler.optimize_schedule(schedule)
+
 
 class ProductionPlannerSubAgent(BaseSubAgent):
     """
@@ -28,17 +55,36 @@ class ProductionPlannerSubAgent(BaseSubAgent):
         - orders_file: CSV 파일 경로 (옵션)
         - orders: 주문 리스트 (옵션)
         - target_date: 스케줄 날짜
+        - executor: 최적화 계산용 executor (옵션, 상위 에이전트가 지정)
 
     출력:
         - schedule: 생성된 스케줄 JSON
         - summary: 요약 정보
     """
 
-    def __init__(self):
+    def __init__(self, executor: Optional[Executor] = None):
         super().__init__(name="ProductionPlanner", cluster="operations")
+        self.executor = executor  # 입력에 executor가 없을 때 사용 (None이면 기본 스레드 풀)
+        self._last_run: Optional[tuple] = None  # (입력 지문, Schedule)
+
+    def clear_cache(self):
+        """지난 실행 결과 캐시 비우기 (다음 실행은 입력이 같아도 다시 최적화)
+
+        입력 밖의 조건(설비/차량 설정, 마스터 데이터 등)이 바뀌었을 때 호출한다.
+        (FactorySupervisorAgent처럼 여러 상위 에이전트가 공유하면 모두에 적용된다)
+        """
+        self._last_run = None
 
     async def execute(self, ctx: SubAgentContext, input_data: dict) -> SubAgentResult:
         """생산 스케줄 생성"""
+        # 최적화 모듈은 처음 실행할 때 로드한다 (패키지 import 시간 단축)
+        from scripts.optimizers.production_scheduler import (
+            orders_from_records,
+            load_orders_from_csv,
+            create_sample_orders,
+            format_schedule_json,
+        )
+
         try:
             # 입력 파싱
             orders_file = input_data.get('orders_file')
@@ -46,43 +92,40 @@ class ProductionPlannerSubAgent(BaseSubAgent):
             target_date_str = input_data.get('target_date')
 
             # 날짜 파싱
-            if target_date_str:
-                target_date = datetime.fromisoformat(target_date_str)
-            else:
-                target_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-
-            self.logger.info(f"[{ctx.job_id}] 생산 스케줄 생성: {target_date.strftime('%Y-%m-%d')}")
-
-            # 주문 로드
-            if orders_data:
-                orders = [
-                    Order(
-                        order_id=o['order_id'],
-                        product_code=o['product_code'],
-                        width_mm=o['width_mm'],
-                        quantity_rolls=o['quantity_rolls'],
-                        due_date=o['due_date'],
-                        color=o.get('color', 'CLEAR'),
-                        priority=o.get('priority', 1)
-                    )
-                    for o in orders_data
-                ]
-            elif orders_file:
-                orders = load_orders_from_csv(orders_file)
+            target_date = parse_target_date(target_date_str)
+
+            date_iso = target_date.strftime('%Y-%m-%d')
+            self.logger.info("[%s] 생산 스케줄 생성: %s", ctx.job_id, date_iso)
+
+            # 입력이 지난 실행과 같으면 로드/최적화 없이 이전 스케줄 재사용
+            # (지문 계산은 레코드 직렬화가 커질 수 있어 워커 스레드에서)
+            key = await asyncio.to_thread(input_fingerprint, date_iso, orders_data, orders_file)
+            last = self._last_run
+            if key is not None and last is not None and last[0] == key:
+                self.logger.info("[%s] 입력 변경 없음 - 이전 스케줄 재사용", ctx.job_id)
+                schedule = last[1]
             else:
-                orders = create_sample_orders()
-
-            # 스케줄 생성
-            scheduler = ProductionScheduler()
-            scheduler.add_orders(orders)
-
-            schedule = scheduler.create_schedule(target_date)
-            schedule = scheduler.optimize_schedule(schedule)
-
+                # 주문 로드
+                # 레코드 변환/파일 파싱은 워커 스레드에서 (이벤트 루프를 막지 않도록)
+                if orders_data:
+                    orders = await asyncio.to_thread(orders_from_records, orders_data)
+                elif orders_file:
+                    orders = await asyncio.to_thread(load_orders_from_csv, orders_file)
+                else:
+                    orders = create_sample_orders()
+
+                # 스케줄 생성 (CPU 작업은 executor에서 실행해 다른 서브에이전트와 겹치게 한다)
+                loop = asyncio.get_running_loop()
+                executor = input_data.get('executor') or self.executor
+                schedule = await loop.run_in_executor(executor, _run_pipeline, orders, target_date)
+                self._last_run = (key, schedule)
+
+            # 결과 dict는 매번 새로 만든다 (호출자가 결과를 수정해도 캐시된 스케줄은 그대로)
             schedule_json = format_schedule_json(schedule)
-            summary = schedule.summary()
+            # format_schedule_json이 이미 계산한 요약 재사용 (schedule_json 안의 dict와 공유하지 않도록 복사)
+            summary = dict(schedule_json['summary'])
 
-            self.logger.info(f"[{ctx.job_id}] 생산 배정: {summary['total_orders']}건")
+            self.logger.info("[%s] 생산 배정: %d건", ctx.job_id, summary['total_orders'])
 
             return SubAgentResult(
                 agent_name=self.name,
@@ -96,7 +139,7 @@ class ProductionPlannerSubAgent(BaseSubAgent):
             )
 
         except Exception as e:
-            self.logger.error(f"[{ctx.job_id}] 생산 스케줄 실패: {e}")
+            self.logger.error("[%s] 생산 스케줄 실패: %s", ctx.job_id, e)
             return SubAgentResult(
                 agent_name=self.name,
                 status="error",